@@ -1,9 +1,18 @@
+import threading
 import streamlit as st
-from processor import process_uploaded_file, query_local_model
+import ollama
+from processor import process_uploaded_file, query_local_model, extract_search_keyword, warm_up_models, clear_retriever_cache
 from disk_ops import DiskScout
 
 st.set_page_config(page_title="DocuSenseAI v2.0", layout="wide")
 
+@st.cache_resource
+def start_model_warmup():
+    # cache_resource -> runs once per server process, not on every rerun
+    threading.Thread(target=warm_up_models, daemon=True).start()
+
+start_model_warmup()
+
 # initialize session state initialization
 if "disk_scout" not in st.session_state:
     st.session_state.disk_scout = DiskScout()
@@ -22,6 +31,7 @@ with st.sidebar:
     if st.button("🗑️ Forget All Data"):
         st.session_state.retriever = None
         st.session_state.disk_scout = DiskScout() # Re-init to clear paths
+        clear_retriever_cache() # cached indexes keep the uploads' chunk text on disk
         st.rerun() # refreshes the app
 
     st.divider()
@@ -78,6 +88,7 @@ if query and st.button("Ask AI"):
             # ── Agent Reasoning Trace ────────────────────────────────────────────
             if grade_log:
                 relevant_count = sum(1 for g in grade_log if g["is_relevant"])
+                skipped_count = sum(1 for g in grade_log if not g.get("graded", True))
                 total_count = len(grade_log)
                 rewrites = 0
                 # infer rewrites: if any query rewrite happened, sources < grade_log implies looping
@@ -85,18 +96,27 @@ if query and st.button("Ask AI"):
 
                 with st.expander(f"🧠 Agent Reasoning Trace  —  {relevant_count}/{total_count} chunks passed grading"):
                     for i, entry in enumerate(grade_log):
-                        icon = "✅" if entry["is_relevant"] else "❌"
-                        relevance_label = "Relevant" if entry["is_relevant"] else "Irrelevant"
+                        if not entry.get("graded", True):
+                            icon, relevance_label = "⏭️", "Not graded"
+                        else:
+                            icon = "✅" if entry["is_relevant"] else "❌"
+                            relevance_label = "Relevant" if entry["is_relevant"] else "Irrelevant"
                         st.markdown(f"**Chunk {i+1}** {icon} `{relevance_label}`")
                         st.caption(f"💬 Grader: _{entry['reason']}_")
                         with st.expander(f"Preview chunk {i+1}", expanded=False):
                             st.text(entry["chunk_preview"])
                         st.divider()
 
+                    filtered_count = total_count - relevant_count - skipped_count
                     if relevant_count == 0:
                         st.warning("⚠️ All chunks were graded irrelevant. A query rewrite was attempted before generating the final answer.")
                     elif relevant_count < total_count:
-                        st.info(f"ℹ️ {total_count - relevant_count} chunk(s) were filtered out. Answer was generated from the {relevant_count} relevant chunk(s).")
+                        outcome = []
+                        if filtered_count:
+                            outcome.append(f"{filtered_count} chunk(s) were filtered out")
+                        if skipped_count:
+                            outcome.append(f"{skipped_count} not graded (relevant majority reached early)")
+                        st.info(f"ℹ️ {' and '.join(outcome)}. Answer was generated from the {relevant_count} relevant chunk(s).")
                     else:
                         st.success("✅ All chunks passed grading. Answer generated from full context.")
 
@@ -109,8 +129,6 @@ if query and st.button("Ask AI"):
 
     # ── LOCAL DISK SCOUT (unchanged) ─────────────────────────────────────────────
     elif search_mode == "Local Disk Scout":
-        from processor import extract_search_keyword
-        
         with st.spinner("Deciding what to search for..."):
             keyword = extract_search_keyword(query)
             st.caption(f"🔍 Searching for files matching: **'{keyword}'**")
@@ -126,13 +144,13 @@ if query and st.button("Ask AI"):
             
             # read and reason..
             file_contents = []
-            for m in matches:
-                content = st.session_state.disk_scout.read_file_lazy(m)
+            # duplicate copies of the same doc are only sent to the model once
+            unique_files = st.session_state.disk_scout.read_unique_files(matches)
+            for m, content in unique_files:
                 # limited content size avoids crashing 
                 file_contents.append(f"FILENAME: {m.name}\nCONTENT: {content[:4000]}...")
             
             with st.spinner("Reading & Generating Answer..."):
-                import ollama
                 context_text = "\n\n".join(file_contents)
                 
                 system_prompt = f"""
@@ -150,15 +168,16 @@ if query and st.button("Ask AI"):
                 - Explicitly mention which file you are reading.
                 """
                 
-                response = ollama.chat(model='phi3', messages=[
+                stream = ollama.chat(model='phi3', messages=[
                     {'role': 'system', 'content': system_prompt},
                     {'role': 'user', 'content': "Execute the instruction based on the files above."},
-                ])
+                ], stream=True)
                 
+                # tokens are rendered as they arrive (st.write_stream needs Streamlit >= 1.31)
                 st.markdown("### 🤖 Local Insight:")
-                st.write(response['message']['content'])
+                st.write_stream(chunk['message']['content'] for chunk in stream)
                 
                 st.divider()
                 st.write("📂 **Files Accessed:**")
-                for m in matches:
+                for m, _ in unique_files:
                     st.code(str(m))
\ No newline at end of file
@@ -1,16 +1,151 @@
 import os
-import glob
+import time
+import hashlib
+import weakref
+import threading
 import pandas as pd
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
 import docx2txt
+from openpyxl import load_workbook
 from pathlib import Path
 from langchain_community.document_loaders import PyPDFLoader
+try:
+    import pymupdf   # MuPDF's C text extraction, much faster than pure-python pypdf (what PyMuPDFLoader imports)
+    from langchain_community.document_loaders import PyMuPDFLoader as PDFLoader
+except ImportError:
+    PDFLoader = PyPDFLoader
+try:
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa_csv = None
 
 # Safety Blocklist- must not scanning entire OS or sensitive system folders
 BLOCKED_DIRS = ["/", "/bin", "/Windows", "/System", "/usr", "/etc", "C:\\", "C:\\Windows"]
 
+# normalized once at import: resolved paths, so separators/casing match what add_path sees
+_BLOCKED = {Path(b).resolve() for b in BLOCKED_DIRS if Path(b).exists()}
+# subtrees are blocked too - except filesystem/drive roots, which every path lives under
+_BLOCKED_TREES = {b for b in _BLOCKED if b != Path(b.anchor)}
+
+MAX_MATCHES = 10
+
+# lazy-read cache: entries keyed by (path, mtime_ns, size) so edited files miss automatically
+READ_CACHE_SIZE = 64
+READ_CACHE_MAX_CHARS = 64 * 1024  # callers only ever use the first 4000 chars
+
+# stop pulling PDF pages once this much text is in hand (callers truncate to 4000)
+PDF_READ_CHARS = 4200
+
+# rows pulled from each sheet/CSV for the lazy-read data sample
+SAMPLE_ROWS = 20
+
+# files whose opening this many chars match an earlier read are treated as duplicates
+DEDUPE_PREFIX_CHARS = 512
+
+# in-memory filename index per allowed folder (bigger folders fall back to a live walk)
+INDEX_MAX_FILES = 50_000
+INDEX_REFRESH_SECONDS = 10
+
+def _sample_table(header, rows):
+    """
+    Renders a header + rows as a pipe-delimited table without building a DataFrame.
+    """
+    header = ["" if h is None else str(h) for h in header]
+    lines = ["| " + " | ".join(header) + " |", "|" + "|".join(["---"] * len(header)) + "|"]
+    for row in rows:
+        lines.append("| " + " | ".join("" if v is None else str(v) for v in row) + " |")
+    return "\n".join(lines)
+
+def _iter_files(root, on_dir=None, stop=None):
+    """
+    Breadth-first os.scandir walk yielding a DirEntry for every regular file under root.
+    Skips hidden files/folders and never follows symlinks (DirEntry caches the type, so no extra stat).
+    on_dir, if given, is called with each folder as it is opened.
+    stop, if given, is a threading.Event checked before each folder - set it to end the walk.
+    """
+    pending = deque([root])
+    while pending:
+        if stop is not None and stop.is_set():
+            return
+        current = pending.popleft()
+        try:
+            with os.scandir(current) as it:
+                if on_dir is not None:
+                    on_dir(current)
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError:
+            # unreadable folder (permissions, vanished mid-scan) - skip it
+            continue
+
+def _iter_matches(root, kw_lower, stop=None):
+    """
+    Yields files under root whose name contains kw_lower.
+    """
+    for entry in _iter_files(root, stop=stop):
+        if kw_lower in entry.name.lower():
+            yield Path(entry.path)
+
+def _collect_matches(root, kw_lower, stop):
+    """
+    Drains _iter_matches for one root, bailing out once MAX_MATCHES are found
+    or another root's scan has already filled the quota.
+    """
+    found = []
+    # stop is also checked per folder inside the walk, so a match-free tree ends promptly too
+    for m in _iter_matches(root, kw_lower, stop):
+        if stop.is_set():
+            break
+        found.append(m)
+        if len(found) == MAX_MATCHES:
+            break
+    return found
+
+def _index_is_stale(dir_mtimes):
+    """
+    True if any indexed folder was modified (or vanished) since the index was built.
+    A folder's mtime moves whenever an entry directly inside it is added, removed or renamed.
+    """
+    for d, mtime in dir_mtimes.items():
+        try:
+            if os.stat(d).st_mtime_ns != mtime:
+                return True
+        except OSError:
+            return True
+    return False
+
+def _watch_indexes(scout_ref):
+    """
+    Low-frequency loop re-checking folder mtimes of every indexed tree.
+    Holds only a weakref so a discarded DiskScout ("Forget All Data") ends the thread.
+    """
+    while True:
+        time.sleep(INDEX_REFRESH_SECONDS)
+        scout = scout_ref()
+        if scout is None:
+            return
+        scout._refresh_stale_indexes()
+        del scout
+
 class DiskScout:
     def __init__(self):
         self.allowed_paths = []
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # folder -> ([(name_lower, Path)], {dir: st_mtime_ns}); filled by background threads
+        self._index = {}
+        self._index_lock = threading.Lock()
+        self._watcher = None
 
     def add_path(self, path_str):
         """
@@ -25,47 +160,194 @@ class DiskScout:
             return False, "❌ Path is not a directory."
         
         # check against blocklist
-        for blocked in BLOCKED_DIRS:
-            if str(path) == blocked:
-                return False, "⛔ Security Alert: System root folders are blocked."
+        if path in _BLOCKED:
+            return False, "⛔ Security Alert: System root folders are blocked."
+        if any(parent in _BLOCKED_TREES for parent in path.parents):
+            return False, "⛔ Security Alert: Folders inside system directories are blocked."
         
         # add to allowlist
         if path not in self.allowed_paths:
             self.allowed_paths.append(path)
+            self._start_indexing(path)
             return True, f"✅ Access granted: {path.name}"
         return True, "Path already allowed."
 
+    def _start_indexing(self, folder):
+        """
+        Builds the folder's filename index off the request path and makes sure the watcher runs.
+        """
+        threading.Thread(target=self._index_folder, args=(folder,), daemon=True).start()
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=_watch_indexes, args=(weakref.ref(self),), daemon=True)
+            self._watcher.start()
+
+    def _index_folder(self, folder):
+        files, dir_mtimes = [], {}
+
+        def record_dir(d):
+            dir_mtimes[d] = os.stat(d).st_mtime_ns
+
+        for entry in _iter_files(folder, on_dir=record_dir):
+            files.append((entry.name.lower(), Path(entry.path)))
+            if len(files) > INDEX_MAX_FILES:
+                return  # too big to keep in memory - scout_files walks it live
+
+        with self._index_lock:
+            if folder in self.allowed_paths:
+                self._index[folder] = (files, dir_mtimes)
+
+    def _refresh_stale_indexes(self):
+        """
+        Rebuilds the index of any folder whose directory tree changed since it was built.
+        """
+        with self._index_lock:
+            snapshot = list(self._index.items())
+
+        for folder, (_, dir_mtimes) in snapshot:
+            if not _index_is_stale(dir_mtimes):
+                continue
+
+            with self._index_lock:
+                self._index.pop(folder, None)  # live walk until the rebuild lands
+            self._index_folder(folder)
+
     def scout_files(self, keyword):
         """
         Scans ALLOWED folders for filenames matching the keyword.
         Does NOT read file content. Fast & Private.
         """
         matches = []
+        if not self.allowed_paths:
+            return matches
+
+        kw_lower = keyword.lower()
+        with self._index_lock:
+            indexed = {folder: self._index.get(folder) for folder in self.allowed_paths}
+
+        # indexed folders are a plain substring scan over cached names, once a stat of
+        # their directories shows nothing was added/removed since the watcher's last pass
+        unindexed = []
         for folder in self.allowed_paths:
-            # Simple case-insensitive filename match
-            # look for keyword in the filename
-            search_pattern = str(folder / "**" / f"*{keyword}*")
-            
-            # recursive search (depth is an imp thing in production)
-            found_files = glob.glob(search_pattern, recursive=True)
-            
-            for f in found_files:
-                p = Path(f)
-                if p.is_file() and not p.name.startswith('.'): # Ignore hidden files
+            if indexed[folder] is not None and _index_is_stale(indexed[folder][1]):
+                with self._index_lock:
+                    self._index.pop(folder, None)  # live walk until the rebuild lands
+                threading.Thread(target=self._index_folder, args=(folder,), daemon=True).start()
+                indexed[folder] = None
+            if indexed[folder] is None:
+                unindexed.append(folder)
+                continue
+            for name_lower, p in indexed[folder][0]:
+                if kw_lower in name_lower:
                     matches.append(p)
-        
-        # limit to top 10 matches - else context overflow
-        return matches[:10]
+                    # limit to top 10 matches - else context overflow
+                    if len(matches) == MAX_MATCHES:
+                        return matches
+
+        if not unindexed:
+            return matches
+
+        stop = threading.Event()
+
+        # walk the rest (still indexing / too large) concurrently - directory I/O releases the GIL
+        with ThreadPoolExecutor(max_workers=min(8, len(unindexed))) as pool:
+            futures = [pool.submit(_collect_matches, folder, kw_lower, stop) for folder in unindexed]
+            for future in as_completed(futures):
+                matches.extend(future.result())
+                # limit to top 10 matches - else context overflow
+                if len(matches) >= MAX_MATCHES:
+                    stop.set()
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+        return matches[:MAX_MATCHES]
 
-# capable of extracting text from PDF, DOCX, XLSX, and Text files
     def read_file_lazy(self, file_path):
+        """
+        Returns the extracted text of a file, served from an LRU cache
+        while the file's mtime and size are unchanged.
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return self._read_file_uncached(file_path)
+
+        key = (str(file_path), st.st_mtime_ns, st.st_size)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        content = self._read_file_uncached(file_path)
+        if content.startswith("[Error reading file"):
+            return content  # don't pin failures, the next query may succeed
+        content = content[:READ_CACHE_MAX_CHARS]
+
+        with self._cache_lock:
+            self._cache[key] = content
+            self._cache.move_to_end(key)
+            if len(self._cache) > READ_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return content
+
+    def read_files_lazy(self, paths):
+        """
+        Reads several files concurrently (parsers spend most time in I/O and C code).
+        Results come back in the same order as paths.
+        """
+        if not paths:
+            return []
+        with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+            return list(pool.map(self.read_file_lazy, paths))
+
+    def read_unique_files(self, paths):
+        """
+        read_files_lazy, minus files whose opening text duplicates an earlier match
+        (copies / versions of the same doc). Returns [(path, content)] in match order.
+        """
+        seen = set()
+        unique = []
+        for path, content in zip(paths, self.read_files_lazy(paths)):
+            h = hashlib.blake2b(content[:DEDUPE_PREFIX_CHARS].encode(), digest_size=8).digest()
+            if h in seen:
+                continue
+            seen.add(h)
+            unique.append((path, content))
+        return unique
+
+# capable of extracting text from PDF, DOCX, XLSX, and Text files
+    def _read_file_uncached(self, file_path):
         path_str = str(file_path)
         ext = file_path.suffix.lower()
 
         try:
-            # Excel
-            if ext in [".xlsx", ".xls"]:
-                xls = pd.read_excel(path_str, sheet_name=None)
+            # Excel (xlsx) - openpyxl streaming mode, never loads the full workbook DOM
+            if ext == ".xlsx":
+                wb = load_workbook(path_str, read_only=True, data_only=True)
+                try:
+                    full_text = []
+                    for sheet_name in wb.sheetnames:
+                        rows = wb[sheet_name].iter_rows(values_only=True)
+                        header = next(rows, ())
+                        sample = list(islice(rows, SAMPLE_ROWS))
+                        columns_list = ", ".join("" if h is None else str(h) for h in header)
+
+                        # prioritize the summary + sample for the 'Lazy Read'
+                        # to avoid blowing up the context window with massive files.
+                        full_text.append(f"""
+                    SHEET: {sheet_name}
+                    COLUMNS: {columns_list}
+                    DATA SAMPLE:
+                    {_sample_table(header, sample)}
+                    """)
+                    return "\n".join(full_text)
+                finally:
+                    wb.close()
+
+            # Excel (legacy xls) - openpyxl can't read it, stay on pandas
+            elif ext == ".xls":
+                # only parse the sample rows instead of the whole sheet
+                xls = pd.read_excel(path_str, sheet_name=None, nrows=SAMPLE_ROWS)
                 full_text = []
                 for sheet_name, df in xls.items():
                     df = df.fillna("")
@@ -83,7 +365,16 @@ class DiskScout:
                 return "\n".join(full_text)
 
             elif ext == ".csv":
-                df = pd.read_csv(path_str)
+                if pa_csv is not None:
+                    # multithreaded C++ parser; only the first block is decoded
+                    with pa_csv.open_csv(path_str) as reader:
+                        try:
+                            df = reader.read_next_batch().slice(0, SAMPLE_ROWS).to_pandas()
+                        except StopIteration:
+                            # header-only CSV: no batch at all, but the columns are in the schema
+                            df = reader.schema.empty_table().to_pandas()
+                else:
+                    df = pd.read_csv(path_str, nrows=SAMPLE_ROWS)
                 df = df.fillna("")
                 df.columns = df.columns.astype(str)
                 columns_list = ", ".join(list(df.columns))
@@ -91,7 +382,7 @@ class DiskScout:
                 return f"""
                 FILE: {file_path.name}
                 COLUMNS: {columns_list}
-                DATA:
+                DATA SAMPLE:
                 {df.to_markdown(index=False)}
                 """
 
@@ -101,8 +392,14 @@ class DiskScout:
 
             # PDF
             elif ext == ".pdf":
-                pdf_docs = PyPDFLoader(path_str).load()
-                return "\n".join([doc.page_content for doc in pdf_docs])
+                # stream pages instead of materializing the whole document
+                parts, total = [], 0
+                for doc in PDFLoader(path_str).lazy_load():
+                    parts.append(doc.page_content)
+                    total += len(doc.page_content)
+                    if total >= PDF_READ_CHARS:
+                        break
+                return "\n".join(parts)
             
             # Text/Code
             else:
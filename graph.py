@@ -4,7 +4,7 @@ LangGraph CRAG (Corrective RAG) state machine for DocuSenseAI v2.
 
 Flow:
   retrieve → grade_documents → generate        (if docs are relevant)
-                             ↘ rewrite_query → retrieve  (if all docs irrelevant, max 2 retries)
+                             ↘ rewrite_query → retrieve  (if docs irrelevant, max 2 retries)
 """
 
 import json
@@ -14,6 +14,29 @@ from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 from langchain_core.documents import Document
 from langgraph.graph import StateGraph, END
+try:
+    import orjson
+    _loads = orjson.loads   # faster, lower-allocation parser for grader output
+except ImportError:
+    _loads = json.loads
+
+# small-to-big: the grader only sees this much of each chunk
+CHILD_PREVIEW_CHARS = 200
+
+# chunks at or above this vector-similarity score are accepted without the LLM grader
+AUTO_ACCEPT_SCORE = 0.85
+
+# generator routing: short contexts go to a small, fast model, long ones to phi3
+SHORT_CONTEXT_TOKENS = 2000
+SHORT_CONTEXT_MODEL = "llama3.2:1b"
+LONG_CONTEXT_MODEL = "phi3"
+
+# one keep-alive HTTP client shared by every node (host comes from OLLAMA_HOST)
+_OLLAMA = ollama.Client()
+
+# how long Ollama keeps llama3.2 (grader/rewriter/keywords) + the embedder resident between calls;
+# every call to a pinned model has to pass it, or Ollama resets it to its 5 minute default
+OLLAMA_KEEP_ALIVE = "24h"
 
 
 # ─────────────────────────────────────────────
@@ -23,15 +46,19 @@ class AgentState(TypedDict):
     query: str                  # current (possibly rewritten) query
     original_query: str         # never mutated — for display purposes
     retriever: object           # EnsembleRetriever or VectorStore passed in
-    documents: List[Document]   # retrieved chunks
+    documents: List[Document]   # retrieved chunks (parents — what generate reads)
+    child_docs: List[Document]  # small previews of `documents`, same order — what the grader reads.
+                                # Built from doc.metadata["child_preview"] (set at ingest) or the
+                                # first CHILD_PREVIEW_CHARS of the parent for other retrievers.
     relevant_docs: List[Document]  # docs that passed grading
     generation: str             # final answer
     retries: int                # how many query rewrites have happened
-    grade_log: List[dict]       # [{chunk_preview, is_relevant, reason}, ...]
+    grade_log: List[dict]       # [{chunk_preview, is_relevant, graded, reason}, ...]
 
 
 # ─────────────────────────────────────────────
 # 2. PYDANTIC SCHEMA — structured grader output
+#    (documents the per-chunk contract; grade_documents reads the raw dicts directly)
 # ─────────────────────────────────────────────
 class GradeOutput(BaseModel):
     is_relevant: bool = Field(description="True if the document chunk is relevant to the query")
@@ -39,83 +66,223 @@ class GradeOutput(BaseModel):
 
 
 # ─────────────────────────────────────────────
-# 3. NODES
+# 3. PROMPTS — built once at import, not per node call
+# ─────────────────────────────────────────────
+_GRADER_SYS = """You are a relevance grader. Given a USER QUERY and a list of numbered DOCUMENT CHUNKS,
+decide for EACH chunk if it contains information useful for answering the query.
+
+Respond ONLY with a JSON object in this exact format (no markdown, no extra text):
+{"grades": [{"idx": 0, "is_relevant": true or false, "reason": "one sentence explanation"}, ...]}
+Include exactly one entry per chunk, using the chunk number as "idx".
+"""
+
+# context is appended at call time: _GEN_SYS_PREFIX + context_text
+_GEN_SYS_PREFIX = """You are DocuSenseAI, a secure local reasoning assistant.
+STRICT RULES:
+1. USE ONLY the provided context.
+2. If the answer is NOT in the context, strictly state: "I cannot find this information in the provided files."
+3. Do NOT invent facts. Do NOT use outside knowledge.
+4. If the user asks to "Summarize", provide a structured summary with bullet points.
+5. If the user asks to "Write content", provide the raw text verbatim.
+
+CONTEXT FROM FILES:
+"""
+
+_REWRITE_SYS = """You are a search query optimizer for a document retrieval system.
+The current query did not return relevant results. Rephrase it to be more specific and likely 
+to match document content. Return ONLY the rewritten query, nothing else."""
+
+
+# ─────────────────────────────────────────────
+# 4. NODES
 # ─────────────────────────────────────────────
 
 def retrieve(state: AgentState) -> AgentState:
     """Search using the hybrid retriever (Semantic + BM25)."""
     # use .invoke() for any LangChain retriever
+    # semantic hits arrive with metadata["score"] set by processor.ScoredVectorStoreRetriever
     docs = state["retriever"].invoke(state["query"])
-    return {**state, "documents": docs}
 
+    child_docs = [
+        Document(
+            page_content=doc.metadata.get("child_preview") or doc.page_content[:CHILD_PREVIEW_CHARS],
+            metadata=doc.metadata,
+        )
+        for doc in docs
+    ]
+    return {**state, "documents": docs, "child_docs": child_docs}
 
-def grade_documents(state: AgentState) -> AgentState:
+
+def _as_bool(value) -> bool:
     """
-    Grade each retrieved chunk for relevance using llama3.
-    Uses a JSON-based prompt to approximate structured output from ollama.
+    Grader "is_relevant" -> bool. Real bools pass through; strings are mapped explicitly
+    (bool("false") is True), matching how GradeOutput used to coerce them.
     """
-    grade_log = []
-    relevant_docs = []
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "yes", "1")
 
-    grader_system = """You are a relevance grader. Given a USER QUERY and a DOCUMENT CHUNK,
-decide if the chunk contains information useful for answering the query.
 
-Respond ONLY with a JSON object in this exact format (no markdown, no extra text):
-{"is_relevant": true or false, "reason": "one sentence explanation"}
-"""
+def _parse_streamed_grades(raw: str, pos: int):
+    """
+    Decode every complete grade object in the partial grader output, starting at pos.
+    Returns (entries, new_pos); incomplete trailing objects are left for the next call.
+    """
+    entries = []
+    if pos == 0:
+        start = raw.find("[")
+        if start < 0:
+            return entries, 0
+        pos = start + 1
+
+    while True:
+        while pos < len(raw) and raw[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(raw) or raw[pos] != "{":
+            return entries, pos
+        # try each closing brace in turn; a "}" inside a reason string just fails to parse
+        end = raw.find("}", pos)
+        while end != -1:
+            try:
+                entry = _loads(raw[pos:end + 1])
+                break
+            except ValueError:
+                end = raw.find("}", end + 1)
+        if end == -1:
+            return entries, pos  # object still being generated
+        entries.append(entry)
+        pos = end + 1
 
-    for doc in state["documents"]:
-        chunk_preview = doc.page_content[:300].replace("\n", " ")
-        user_msg = f"USER QUERY: {state['query']}\n\nDOCUMENT CHUNK:\n{doc.page_content}"
+
+def grade_documents(state: AgentState) -> AgentState:
+    """
+    Grade all retrieved chunks for relevance using llama3 in ONE batched request.
+    Chunks are numbered in a single prompt so the system preamble is prefilled once,
+    and the model returns a JSON array of per-chunk grades.
+
+    Chunks whose retrieval score is >= AUTO_ACCEPT_SCORE are accepted without the LLM.
+    The response is streamed and grades are parsed as they arrive. Once a majority of
+    chunks is relevant (generate is guaranteed) or irrelevant (a rewrite is the better bet),
+    the stream is closed so Ollama stops decoding the remaining grades.
+    """
+    grade_log = []
+    relevant_docs = []
+    documents = state["documents"]
+    total = len(documents)
+    threshold = (total + 1) // 2  # ceil(K/2)
+
+    # confident retrieval hits skip the grader entirely
+    grades = {
+        i: (True, f"(auto-accepted — retrieval score {doc.metadata['score']:.2f})")
+        for i, doc in enumerate(documents)
+        if doc.metadata.get("score", 0) >= AUTO_ACCEPT_SCORE
+    }
+    pending = [i for i in range(total) if i not in grades]
+    relevant_count, irrelevant_count = len(grades), 0
+    # never throw away auto-accepted chunks for a rewrite
+    can_rewrite = state.get("retries", 0) < 2 and not grades
+
+    failure = None
+    early_exit = "relevant" if relevant_count >= threshold else None  # or "irrelevant" when cut short
+    if pending and not early_exit:
+        # grade the short child previews; the full parents still go to generate
+        children = state.get("child_docs") or documents
+        chunks_text = "\n\n".join(f"=== CHUNK {n} ===\n{children[i].page_content}" for n, i in enumerate(pending))
+        user_msg = f"USER QUERY: {state['query']}\n\nDOCUMENT CHUNKS:\n{chunks_text}"
 
         try:
-            response = ollama.chat(
+            stream = _OLLAMA.chat(
                 model="llama3.2",
                 format="json",  # Force Ollama to return valid JSON
                 messages=[
-                    {"role": "system", "content": grader_system},
+                    {"role": "system", "content": _GRADER_SYS},
                     {"role": "user", "content": user_msg},
                 ],
+                stream=True,
+                keep_alive=OLLAMA_KEEP_ALIVE,
             )
-            raw = response["message"]["content"].strip()
-            parsed = json.loads(raw)
-            grade = GradeOutput(**parsed)
-
+            raw, pos = "", 0
+            graded = 0
+            for chunk in stream:
+                raw += chunk["message"]["content"]
+                entries, pos = _parse_streamed_grades(raw, pos)
+                for entry in entries:
+                    try:
+                        # read fields straight off the dict — format="json" already fixes the shape
+                        n = int(entry["idx"])
+                        is_relevant = _as_bool(entry.get("is_relevant", True))
+                        reason = str(entry.get("reason", ""))
+                    except Exception:
+                        continue  # malformed entry — that chunk falls back to relevant below
+                    if not 0 <= n < len(pending) or pending[n] in grades:
+                        continue
+                    grades[pending[n]] = (is_relevant, reason)
+                    graded += 1
+                    if is_relevant:
+                        relevant_count += 1
+                    else:
+                        irrelevant_count += 1
+
+                if relevant_count >= threshold:
+                    early_exit = "relevant"
+                elif can_rewrite and irrelevant_count > total - threshold:
+                    early_exit = "irrelevant"
+                if early_exit:
+                    stream.close()  # drops the connection so Ollama stops generating
+                    break
+
+            if not graded:
+                raise ValueError(f"no grades in grader output: {raw[:200]!r}")
         except Exception as e:
-            # If parsing fails, default to relevant to avoid losing context
-            grade = GradeOutput(is_relevant=True, reason=f"(grading failed: {e}) — defaulted to relevant")
+            # Any chunk left without a grade defaults to relevant to avoid losing context
+            failure = e
+
+    for i, doc in enumerate(documents):
+        chunk_preview = doc.page_content[:300].replace("\n", " ")
+
+        graded = True
+        if i in grades:
+            is_relevant, reason = grades[i]
+        elif early_exit == "relevant":
+            # never graded, so it isn't passed to generate; the relevant majority is enough context
+            is_relevant, graded, reason = False, False, "(not graded — relevant majority already reached)"
+        elif early_exit == "irrelevant":
+            is_relevant, graded, reason = False, False, "(not graded — majority irrelevant, query will be rewritten)"
+        else:
+            cause = f"(grading failed: {failure})" if failure else "(no grade returned)"
+            is_relevant, reason = True, f"{cause} — defaulted to relevant"
 
         grade_log.append({
             "chunk_preview": chunk_preview,
-            "is_relevant": grade.is_relevant,
-            "reason": grade.reason,
+            "is_relevant": is_relevant,
+            "graded": graded,
+            "reason": reason,
         })
 
-        if grade.is_relevant:
+        if is_relevant:
             relevant_docs.append(doc)
 
+    if early_exit == "irrelevant":
+        # irrelevant majority — clear the survivors so route_after_grading rewrites
+        relevant_docs = []
+
     return {**state, "relevant_docs": relevant_docs, "grade_log": grade_log}
 
 
 def generate(state: AgentState) -> AgentState:
-    """Generate a final answer from the relevant docs using phi3."""
+    """
+    Generate a final answer from the relevant docs.
+    Uses llama3.2:1b when the context is short (~4 chars per token estimate), phi3 otherwise.
+    """
     docs_to_use = state["relevant_docs"] if state["relevant_docs"] else state["documents"]
     context_text = "\n\n---\n\n".join([doc.page_content for doc in docs_to_use])
 
-    system_prompt = f"""You are DocuSenseAI, a secure local reasoning assistant.
-STRICT RULES:
-1. USE ONLY the provided context.
-2. If the answer is NOT in the context, strictly state: "I cannot find this information in the provided files."
-3. Do NOT invent facts. Do NOT use outside knowledge.
-4. If the user asks to "Summarize", provide a structured summary with bullet points.
-5. If the user asks to "Write content", provide the raw text verbatim.
+    system_prompt = _GEN_SYS_PREFIX + context_text
+    ctx_tokens = len(context_text) // 4
+    model = SHORT_CONTEXT_MODEL if ctx_tokens < SHORT_CONTEXT_TOKENS else LONG_CONTEXT_MODEL
 
-CONTEXT FROM FILES:
-{context_text}
-"""
-
-    response = ollama.chat(
-        model="phi3",
+    response = _OLLAMA.chat(
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": state["original_query"]},
@@ -130,16 +297,13 @@ def rewrite_query(state: AgentState) -> AgentState:
     Rewrite the query when grader says all docs are irrelevant.
     Uses llama3 to rephrase for a better vector search hit.
     """
-    system_prompt = """You are a search query optimizer for a document retrieval system.
-The current query did not return relevant results. Rephrase it to be more specific and likely 
-to match document content. Return ONLY the rewritten query, nothing else."""
-
-    response = ollama.chat(
+    response = _OLLAMA.chat(
         model="llama3.2",
         messages=[
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": _REWRITE_SYS},
             {"role": "user", "content": f"Original query: {state['query']}"},
         ],
+        keep_alive=OLLAMA_KEEP_ALIVE,
     )
 
     rewritten = response["message"]["content"].strip()
@@ -149,12 +313,13 @@ to match document content. Return ONLY the rewritten query, nothing else."""
 
 
 # ─────────────────────────────────────────────
-# 4. ROUTING LOGIC
+# 5. ROUTING LOGIC
 # ─────────────────────────────────────────────
 def route_after_grading(state: AgentState) -> Literal["generate", "rewrite_query"]:
     """
     If any docs passed grading → generate.
     If all docs failed AND we haven't retried 2 times yet → rewrite.
+    (grade_documents also empties relevant_docs when it stops early on an irrelevant majority.)
     If we've retried 2 times already → generate anyway (best-effort).
     """
     has_relevant = len(state["relevant_docs"]) > 0
@@ -167,7 +332,7 @@ def route_after_grading(state: AgentState) -> Literal["generate", "rewrite_query
 
 
 # ─────────────────────────────────────────────
-# 5. BUILD & COMPILE THE GRAPH
+# 6. BUILD & COMPILE THE GRAPH
 # ─────────────────────────────────────────────
 def build_crag_graph():
     graph = StateGraph(AgentState)
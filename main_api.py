@@ -1,13 +1,26 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
 import ollama
-from processor import process_uploaded_file, query_local_model, extract_search_keyword
+from processor import process_uploaded_file, query_local_model, extract_search_keyword, warm_up_models, clear_retriever_cache
 from disk_ops import DiskScout
 
-app = FastAPI(title="DocuSenseAI API", version="2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load + pin the models in the background; serving starts without waiting on Ollama
+    asyncio.get_running_loop().run_in_executor(None, warm_up_models)
+    yield
+
+app = FastAPI(title="DocuSenseAI API", version="2.0", lifespan=lifespan)
+
+# non-blocking client so a long generation doesn't stall other requests
+aio_ollama = ollama.AsyncClient()
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,6 +44,7 @@ state = AppState()
 class QueryRequest(BaseModel):
     query: str
     mode: str = "Uploaded Documents" # "Uploaded Documents" or "Local Disk Scout"
+    stream: bool = False # Local Disk Scout only: answer as text/event-stream instead of JSON
 
 class QueryResponse(BaseModel):
     answer: str
@@ -52,7 +66,7 @@ async def root():
 async def upload_document(file: UploadFile = File(...)):
     try:
         content = await file.read()
-        retriever, count = process_uploaded_file(file.filename, content)
+        retriever, count = await asyncio.to_thread(process_uploaded_file, file.filename, content)
         state.retriever = retriever
         if file.filename not in state.indexed_files:
             state.indexed_files.append(file.filename)
@@ -66,7 +80,7 @@ async def query_ai(request: QueryRequest):
         if not state.retriever:
             raise HTTPException(status_code=400, detail="Please upload a document first.")
         
-        answer, sources, grade_log = query_local_model(request.query, state.retriever)
+        answer, sources, grade_log = await asyncio.to_thread(query_local_model, request.query, state.retriever)
         # Convert sources (list of Document) to list of strings
         source_texts = [doc.page_content for doc in sources]
         
@@ -78,8 +92,9 @@ async def query_ai(request: QueryRequest):
         )
     
     elif request.mode == "Local Disk Scout":
-        keyword = extract_search_keyword(request.query)
-        matches = state.disk_scout.scout_files(keyword)
+        # keyword LLM call and disk walk are blocking - keep them off the event loop
+        keyword = await asyncio.to_thread(extract_search_keyword, request.query)
+        matches = await asyncio.to_thread(state.disk_scout.scout_files, keyword)
         
         if not matches:
             return QueryResponse(
@@ -90,8 +105,9 @@ async def query_ai(request: QueryRequest):
         
         file_contents = []
         source_paths = []
-        for m in matches:
-            content = state.disk_scout.read_file_lazy(m)
+        # duplicate copies of the same doc are only sent to the model once
+        unique_reads = await asyncio.to_thread(state.disk_scout.read_unique_files, matches)
+        for m, content in unique_reads:
             file_contents.append(f"FILENAME: {m.name}\nCONTENT: {content[:4000]}...")
             source_paths.append(str(m))
             
@@ -111,10 +127,22 @@ async def query_ai(request: QueryRequest):
         - Explicitly mention which file you are reading.
         """
         
-        response = ollama.chat(model='phi3', messages=[
+        messages = [
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': "Execute the instruction based on the files above."},
-        ])
+        ]
+
+        if request.stream:
+            # SSE: one "sources" event, then JSON-encoded token deltas, then "done"
+            async def event_stream():
+                yield f"event: sources\ndata: {json.dumps(source_paths)}\n\n"
+                async for chunk in await aio_ollama.chat(model='phi3', messages=messages, stream=True):
+                    yield f"data: {json.dumps(chunk['message']['content'])}\n\n"
+                yield "event: done\ndata: {}\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        response = await aio_ollama.chat(model='phi3', messages=messages)
         
         return QueryResponse(
             answer=response['message']['content'],
@@ -146,6 +174,7 @@ async def clear_memory():
     state.retriever = None
     state.disk_scout = DiskScout()
     state.indexed_files = []
+    await asyncio.to_thread(clear_retriever_cache)  # uploads' chunk text also lives in the on-disk cache
     return {"message": "Memory cleared successfully."}
 
 if __name__ == "__main__":
@@ -1,10 +1,24 @@
 import tempfile
+import io
 import os
+import time
+import shutil
+import pickle
+import uuid
+import hashlib
+import warnings
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+import faiss
 import pandas as pd
 import ollama  
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, UnstructuredExcelLoader, TextLoader
+from langchain_community.document_loaders import Docx2txtLoader, UnstructuredExcelLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.retrievers import BM25Retriever
 try:
     from langchain.retrievers import EnsembleRetriever
@@ -12,94 +26,474 @@ except ImportError:
     from langchain_classic.retrievers import EnsembleRetriever
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_core.documents import Document
-from graph import crag_graph   # Phase 1: LangGraph CRAG graph
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from typing import Any, List
+try:
+    import bm25s         # sparse-matrix BM25, scored with vectorized numpy
+except ImportError:
+    bm25s = None
+try:
+    import polars as pl   # multithreaded native CSV parser
+except ImportError:
+    pl = None
+try:
+    import pyarrow   # arrow-backed pandas columns (C++ parsing / null handling)
+    _ARROW_BACKEND = {"dtype_backend": "pyarrow"}
+    _ARROW_CSV = {"engine": "pyarrow", **_ARROW_BACKEND}
+except ImportError:
+    _ARROW_BACKEND = _ARROW_CSV = {}
+try:
+    import yake   # statistical keyword extractor, no model call
+except ImportError:
+    yake = None
+try:
+    from semantic_text_splitter import TextSplitter   # Rust splitter via PyO3
+except ImportError:
+    TextSplitter = None
+from disk_ops import PDFLoader   # PyMuPDF when installed, else pypdf - shared with DiskScout
+from graph import crag_graph, CHILD_PREVIEW_CHARS, OLLAMA_KEEP_ALIVE   # Phase 1: LangGraph CRAG graph
 
 # Uses local ollama nomic-embed-text model — no torch/HuggingFace required
 embedding_model = OllamaEmbeddings(model="nomic-embed-text")
 
-def process_uploaded_file(filename, content):
+# on-disk retriever cache: sha256(index version + filename + bytes) -> FAISS index + pickled chunks for BM25
+RETRIEVER_CACHE_DIR = Path(os.environ.get("DOCUSENSE_CACHE_DIR", Path(__file__).resolve().parent / ".docusense_cache"))
+RETRIEVER_CACHE_MAX = 20   # least-recently-used entries (by dir mtime) beyond this are evicted
+
+# chunks sent per ollama.embed request at ingest (query-time encoding stays on embedding_model)
+EMBED_BATCH_SIZE = 64
+
+def _embed_texts(texts):
+    """
+    Embeds chunk texts in batches via ollama.embed - one HTTP round-trip per batch
+    instead of one per chunk. Repeated texts (PDF headers/footers, identical sheets)
+    are embedded once and their vector reused. Returns a float32 array of shape (len(texts), dim).
+    """
+    seen = {}
+    unique_texts = []
+    idx_map = []
+    for text in texts:
+        h = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        if h not in seen:
+            seen[h] = len(unique_texts)
+            unique_texts.append(text)
+        idx_map.append(seen[h])
+
+    vectors = []
+    for start in range(0, len(unique_texts), EMBED_BATCH_SIZE):
+        # same "passage: " instruction OllamaEmbeddings.embed_documents would prepend
+        batch = [embedding_model.embed_instruction + t for t in unique_texts[start:start + EMBED_BATCH_SIZE]]
+        vectors.extend(ollama.embed(model=embedding_model.model, input=batch, keep_alive=OLLAMA_KEEP_ALIVE)["embeddings"])
+    return np.asarray(vectors, dtype=np.float32)[idx_map]
+
+# rows per tabular Document - row groups are natural chunk boundaries, no text splitter needed
+ROWS_PER_CHUNK = 50
+
+# FAISS index choice by corpus size: exact scan is fastest for normal uploads,
+# graph search / compressed inverted lists only pay off on very large ones
+FLAT_MAX_CHUNKS = 2_000   # at ~6 MB of float32 a BLAS-backed exact scan beats decoding SQ8 codes
+HNSW_MIN_CHUNKS = 10_000
+IVFPQ_MIN_CHUNKS = 50_000
+
+# bump when the index layout/metric changes so stale cache entries are never reloaded
+INDEX_VERSION = "sq8-ip-v1"
+
+def _cosine_relevance(score):
+    # vectors are unit-length, so the inner product already is the cosine similarity
+    return score
+
+# every FAISS store is built/loaded with these: unit-length vectors, inner-product metric
+_FAISS_KWARGS = dict(
+    normalize_L2=True,  # LangChain normalizes query vectors to match
+    distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    relevance_score_fn=_cosine_relevance,
+)
+# LangChain warns on every FAISS(...) that normalize_L2 "is not applicable" to inner product,
+# yet still normalizes the query vectors with it - exactly what these stores rely on
+warnings.filterwarnings("ignore", message="Normalizing L2 is not applicable for metric type")
+
+def _faiss_num_gpus():
+    # faiss-cpu builds have no GPU symbols at all
+    return faiss.get_num_gpus() if hasattr(faiss, "StandardGpuResources") else 0
+
+_gpu_resources = None
+
+def _index_to_gpu(index):
+    """
+    Moves an index onto GPU 0 (same search API). Only Flat/IVF indexes have GPU versions;
+    anything else (HNSW, plain scalar quantizer) stays on CPU.
+    """
+    global _gpu_resources
+    if not isinstance(index, (faiss.IndexFlat, faiss.IndexIVF)):
+        return index
+    if _gpu_resources is None:
+        _gpu_resources = faiss.StandardGpuResources()
+    return faiss.index_cpu_to_gpu(_gpu_resources, 0, index)
+
+def _cpu_vector_store(vector_store):
+    """
+    GPU indexes can't be written to disk - returns a view of the store with a CPU copy.
+    """
+    if not type(vector_store.index).__name__.startswith("Gpu"):
+        return vector_store
+    return FAISS(
+        embedding_function=embedding_model,
+        index=faiss.index_gpu_to_cpu(vector_store.index),
+        docstore=vector_store.docstore,
+        index_to_docstore_id=vector_store.index_to_docstore_id,
+        **_FAISS_KWARGS,
+    )
+
+def _build_faiss_index(vectors, use_gpu=False):
+    """
+    Inner-product index over L2-normalized vectors (cosine similarity), tiered by corpus size:
+    exact float32 IndexFlatIP up to FLAT_MAX_CHUNKS (3 KB per vector), 8-bit scalar quantized
+    SQ8 above that (768 bytes per vector), HNSW+SQ8 above HNSW_MIN_CHUNKS (sub-linear graph
+    search), IVF4096+PQ48 above IVFPQ_MIN_CHUNKS (~96 bytes per vector).
+    With use_gpu the whole small tier is IndexFlatIP moved to the GPU (no GPU SQ8 flat index).
+    """
+    faiss.normalize_L2(vectors)
+    n, d = vectors.shape
+    ip = faiss.METRIC_INNER_PRODUCT
+    if n > IVFPQ_MIN_CHUNKS:
+        index = faiss.index_factory(d, "IVF4096,PQ48", ip)
+        index.train(vectors)
+        faiss.extract_index_ivf(index).nprobe = 32
+    elif n > HNSW_MIN_CHUNKS:
+        index = faiss.IndexHNSWSQ(d, faiss.ScalarQuantizer.QT_8bit, 32, ip)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        index.train(vectors)
+    elif use_gpu or n <= FLAT_MAX_CHUNKS:
+        index = faiss.IndexFlatIP(d)
+    else:
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, ip)
+        index.train(vectors)
+    if use_gpu:
+        index = _index_to_gpu(index)
+    index.add(vectors)
+    return index
+
+def _build_vector_store(chunks, vectors, use_gpu=False):
+    """
+    Wraps a prebuilt FAISS index in LangChain's FAISS vector store.
+    """
+    ids = [str(uuid.uuid4()) for _ in chunks]
+    return FAISS(
+        embedding_function=embedding_model,
+        index=_build_faiss_index(vectors, use_gpu),
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids)),
+        **_FAISS_KWARGS,
+    )
+
+def _table_documents(df, source, sheet_name=None):
+    """
+    Turns a DataFrame into Documents: one data card (headers + first 20 rows) for the LLM,
+    then one pipe-delimited Document per ROWS_PER_CHUNK rows (to_csv is C-implemented,
+    unlike rendering the full table through to_markdown). The card's rows are sliced
+    out of the first row group's text, so the head is only serialized once.
+    """
+    # force headers to string to avoid type errors
+    df.columns = df.columns.astype(str)
+    
+    # explicit schema extraction
+    columns_list = ", ".join(list(df.columns))
+    
+    # NaN/NA cells need no fillna pass: to_csv already writes them as empty cells (na_rep="")
+    
+    label = f"SHEET: {sheet_name}" if sheet_name is not None else f"FILE: {source}"
+    metadata = {"source": source}
+    if sheet_name is not None:
+        metadata["sheet"] = sheet_name
+
+    starts = range(0, len(df), ROWS_PER_CHUNK)
+    row_groups = [df.iloc[start:start + ROWS_PER_CHUNK].to_csv(sep="|", index=False) for start in starts]
+    # header line + first 20 rows (ROWS_PER_CHUNK >= 20, so they all sit in the first group)
+    first_rows = row_groups[0] if row_groups else df.to_csv(sep="|", index=False)
+    head_rows = "\n".join(first_rows.splitlines()[:21])
+
+    # data card for the LLM
+    card = f"""
+    --- {label} ---
+    COLUMN HEADERS: [{columns_list}]
+    
+    FIRST 20 ROWS OF DATA:
+    {head_rows}
+    """
+    docs = [Document(page_content=card, metadata=dict(metadata))]
+
+    for start, rows in zip(starts, row_groups):
+        docs.append(Document(page_content=f"--- {label} ---\n{rows}", metadata={**metadata, "row_start": start}))
+    return docs
+
+def _polars_csv_documents(csv_file, source):
+    """
+    CSV counterpart of _table_documents parsed and rendered entirely in polars,
+    without a pandas round-trip. Nulls are written as empty cells by write_csv.
+    Every column is read as a string - the frame is only rendered back to text, and
+    inference breaks on columns that change type late (ints, then "N/A" at row 1501).
+    """
+    df = pl.read_csv(csv_file, infer_schema=False, null_values=[""])
+    columns_list = ", ".join(df.columns)
+    label = f"FILE: {source}"
+
+    # data card for the LLM
+    card = f"""
+    --- {label} ---
+    COLUMN HEADERS: [{columns_list}]
+    
+    FIRST 20 ROWS OF DATA:
+    {df.head(20).write_csv(separator="|")}
+    """
+    docs = [Document(page_content=card, metadata={"source": source})]
+
+    for start in range(0, df.height, ROWS_PER_CHUNK):
+        rows = df.slice(start, ROWS_PER_CHUNK).write_csv(separator="|")
+        docs.append(Document(page_content=f"--- {label} ---\n{rows}", metadata={"source": source, "row_start": start}))
+    return docs
+
+def _parse_and_format_sheet(path, sheet_name, source):
+    """
+    Parses one Excel sheet into its table Documents.
+    Run per sheet on a thread pool by process_uploaded_file.
+    """
+    df = pd.read_excel(path, sheet_name=sheet_name, **_ARROW_BACKEND)
+    return _table_documents(df, source, sheet_name)
+
+class BM25sRetriever(BaseRetriever):
+    """
+    Drop-in for BM25Retriever backed by bm25s: postings live in a SciPy sparse matrix,
+    so a query is one sparse dot product instead of a Python loop over every doc.
+    Tokens are mapped to int ids once at index time; with numba installed the
+    per-query score accumulation + top-k run as JIT-compiled code.
+    """
+    docs: List[Document]
+    model: Any
+    k: int = 5
+
+    @classmethod
+    def from_documents(cls, docs, k=5):
+        model = bm25s.BM25(backend="auto")   # "auto" -> numba kernels when importable, else numpy
+        model.index(bm25s.tokenize([d.page_content for d in docs], stopwords="en", show_progress=False), show_progress=False)
+        return cls(docs=docs, model=model, k=k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if not self.docs:
+            return []
+        query_tokens = bm25s.tokenize([query], stopwords="en", return_ids=False, show_progress=False)
+        if not query_tokens[0]:
+            return []  # all-stopword query ("Is it there?") - the numba backend raises on it
+        ids, _ = self.model.retrieve(query_tokens, k=min(self.k, len(self.docs)), show_progress=False)
+        return [self.docs[i] for i in ids[0]]
+
+class ScoredVectorStoreRetriever(VectorStoreRetriever):
+    """
+    VectorStoreRetriever that keeps the cosine similarity (higher is better) it already
+    computes, as metadata["score"] on copies of the hits - the CRAG grader auto-accepts by it
+    without a second query embedding + search.
+    """
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        # raw inner products of unit vectors are already the cosine (_cosine_relevance is the identity);
+        # the *_with_relevance_scores variant would warn whenever one falls outside [0, 1]
+        hits = self.vectorstore.similarity_search_with_score(query, **self.search_kwargs)
+        # copy - the docstore hands back its stored Document objects
+        return [Document(page_content=doc.page_content, metadata={**doc.metadata, "score": float(score)}) for doc, score in hits]
+
+def _hybrid_retriever(vector_store, chunks):
+    """
+    FAISS (semantic) + BM25 (keyword) ensemble over the same chunks.
+    """
+    # 1. Semantic Retriever (FAISS)
+    faiss_retriever = ScoredVectorStoreRetriever(vectorstore=vector_store, search_kwargs={"k": 5})
+
+    # 2. Keyword Retriever (BM25) - bm25s when installed, LangChain's pure-Python one otherwise
+    if bm25s is not None:
+        bm25_retriever = BM25sRetriever.from_documents(chunks, k=5)
+    else:
+        bm25_retriever = BM25Retriever.from_documents(chunks)
+        bm25_retriever.k = 5
+
+    # 3. Hybrid Ensemble (RRF)
+    # Weights: 70% Semantic, 30% Keyword - good balance for documents
+    return EnsembleRetriever(
+        retrievers=[faiss_retriever, bm25_retriever], 
+        weights=[0.7, 0.3]
+    )
+
+def _load_cached_retriever(key, use_gpu=False):
+    """
+    Rebuilds the hybrid retriever from a cache entry without touching the embedding backend.
+    Returns (retriever, num_chunks) or None on a miss / unreadable entry.
+    """
+    entry = RETRIEVER_CACHE_DIR / key
+    if not (entry / "index.faiss").exists():
+        return None
+    try:
+        # mmap instead of copying the vector block into RAM - the OS page cache keeps it
+        # resident and shares it across sessions; GPU loads copy to the device anyway
+        index_path = str(entry / "index.faiss")
+        if use_gpu:
+            index = faiss.read_index(index_path)
+        else:
+            try:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                index = faiss.read_index(index_path)  # index type without mmap support
+        # our own cache files, so unpickling the docstore is safe here
+        with open(entry / "index.pkl", "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        vector_store = FAISS(
+            embedding_function=embedding_model,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+            **_FAISS_KWARGS,
+        )
+        with open(entry / "bm25.pkl", "rb") as f:
+            chunks = pickle.load(f)
+    except Exception:
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    if use_gpu:
+        vector_store.index = _index_to_gpu(vector_store.index)
+    os.utime(entry)  # mark as recently used for eviction
+    return _hybrid_retriever(vector_store, chunks), len(chunks)
+
+def _save_cached_retriever(key, vector_store, chunks):
+    """
+    Persists a freshly built index; caching is best-effort and never fails an upload.
+    """
+    entry = RETRIEVER_CACHE_DIR / key
+    staging = RETRIEVER_CACHE_DIR / f".{key}.{os.getpid()}.{time.time_ns()}"
+    try:
+        _cpu_vector_store(vector_store).save_local(str(staging))
+        with open(staging / "bm25.pkl", "wb") as f:
+            pickle.dump(chunks, f)
+        os.replace(staging, entry)
+
+        entries = sorted(
+            (d for d in RETRIEVER_CACHE_DIR.iterdir() if d.is_dir() and not d.name.startswith(".")),
+            key=lambda d: d.stat().st_mtime,
+        )
+        for old in entries[:-RETRIEVER_CACHE_MAX]:
+            shutil.rmtree(old, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def clear_retriever_cache():
+    """
+    Deletes every cached index + pickled chunk text on disk and the memoized keyword
+    lookups, for "Forget All Data" / DELETE /memory.
+    """
+    shutil.rmtree(RETRIEVER_CACHE_DIR, ignore_errors=True)
+    _extract_keyword_cached.cache_clear()
+
+# built once per process - the splitter's separator regexes aren't recompiled per upload
+_TEXT_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=1500,
+    chunk_overlap=150,
+    add_start_index=True
+)
+_NATIVE_SPLITTER = TextSplitter(1500, overlap=150) if TextSplitter is not None else None
+
+def _split_document(doc):
+    """
+    Splits one free-text Document into ~1500 char chunks with 150 char overlap.
+    Uses the Rust semantic_text_splitter when installed, else the LangChain splitter;
+    both record the chunk's char offset as metadata["start_index"].
+    """
+    if _NATIVE_SPLITTER is None:
+        return _TEXT_SPLITTER.split_documents([doc])
+    return [
+        Document(page_content=text, metadata={**doc.metadata, "start_index": start})
+        for start, text in _NATIVE_SPLITTER.chunk_indices(doc.page_content)
+    ]
+
+def _split_documents(raw_docs):
+    """
+    Splits every page/document independently, fanned out over threads for multi-page
+    uploads (large PDFs). Chunk order follows raw_docs.
+    """
+    if len(raw_docs) <= 1:
+        return [chunk for doc in raw_docs for chunk in _split_document(doc)]
+
+    with ThreadPoolExecutor(max_workers=min(len(raw_docs), os.cpu_count() or 4)) as pool:
+        chunk_lists = list(pool.map(_split_document, raw_docs))
+    return [chunk for sub in chunk_lists for chunk in sub]
+
+# loaders that only accept a filesystem path; everything else is parsed straight from the upload bytes
+DISK_REQUIRED = {".pdf", ".xlsx", ".xls", ".docx"}
+
+def process_uploaded_file(filename, content, use_gpu=None):
     """
     Ingests PDF, DOCX, XLSX, CSV, TXT, or MD.
     Handles multiple Excel sheets and merged cells better, and returns the vector store.
+    use_gpu builds/searches the FAISS index on a CUDA GPU; None auto-detects faiss-gpu.
     """
-    # save to temp file (preserving extension -crucial)
+    if use_gpu is None:
+        use_gpu = _faiss_num_gpus() > 0
+
     file_ext = os.path.splitext(filename)[1].lower()
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-        tmp_file.write(content)
-        tmp_path = tmp_file.name
+
+    # identical re-uploads skip parsing and embedding entirely; the filename is part of the
+    # key because chunks carry it as metadata["source"]
+    cache_key = hashlib.sha256(f"{INDEX_VERSION}:{filename}\0".encode() + content).hexdigest()
+    cached = _load_cached_retriever(cache_key, use_gpu)
+    if cached is not None:
+        return cached
+
+    # save to temp file (preserving extension -crucial) only for path-based loaders
+    tmp_path = None
+    if file_ext in DISK_REQUIRED:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
+            tmp_file.write(content)
+            tmp_path = tmp_file.name
 
     try:
         loader = None
-        raw_docs = []
+        raw_docs = []     # free text - goes through the splitter
+        table_docs = []   # already chunked by row group
 
         # pdf
         if file_ext == ".pdf":
-            loader = PyPDFLoader(tmp_path)
+            loader = PDFLoader(tmp_path)
             raw_docs = loader.load()
 
         # excel with both extensions
         elif file_ext in [".xlsx", ".xls"]:
-            xls = pd.read_excel(tmp_path, sheet_name=None)
-            full_text = []
-            
-            for sheet_name, df in xls.items():
-                # force headers to string to avoid type errors
-                df.columns = df.columns.astype(str)
-                
-                # explicit schema extraction
-                columns_list = ", ".join(list(df.columns))
-                
-                # clean NaN
-                df = df.fillna("")
-                
-                # data card for the LLM
-                sheet_content = f"""
-                --- SHEET: {sheet_name} ---
-                COLUMN HEADERS: [{columns_list}]
-                
-                FIRST 20 ROWS OF DATA:
-                {df.head(20).to_markdown(index=False)}
-                
-                FULL DATA (Markdown):
-                {df.to_markdown(index=False)}
-                """
-                full_text.append(sheet_content)
+            with pd.ExcelFile(tmp_path) as xls:
+                sheet_names = xls.sheet_names
+
+            # parse + format sheets on threads - worker processes would re-import faiss/langchain
+            # (spawn) or fork a multithreaded server (fork), costing far more than the parsing
+            if len(sheet_names) > 1:
+                workers = min(len(sheet_names), os.cpu_count() or 4)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    sheets = list(pool.map(_parse_and_format_sheet, [tmp_path] * len(sheet_names), sheet_names, [filename] * len(sheet_names)))
+            else:
+                sheets = [_parse_and_format_sheet(tmp_path, name, filename) for name in sheet_names]
             
-            text_content = "\n".join(full_text)
-            raw_docs = [Document(page_content=text_content, metadata={"source": uploaded_file.name})]
+            table_docs = [doc for sheet_docs in sheets for doc in sheet_docs]
         
         # CSV
         elif file_ext == ".csv":
-            df = pd.read_csv(tmp_path)
-            
-            # Explicit Schema (as it threw error in finding column headers)
-            df.columns = df.columns.astype(str)
-            columns_list = ", ".join(list(df.columns))
-            
-            # Data Card
-            df = df.fillna("")
-            text_content = f"""
-            FILE: {uploaded_file.name}
-            COLUMN HEADERS: [{columns_list}]
-            
-            FIRST 20 ROWS SAMPLE:
-            {df.head(20).to_markdown(index=False)}
-            
-            FULL DATA:
-            {df.to_markdown(index=False)}
-            """
-            raw_docs = [Document(page_content=text_content, metadata={"source": uploaded_file.name})]
+            if pl is not None:
+                table_docs = _polars_csv_documents(io.BytesIO(content), filename)
+            else:
+                table_docs = _table_documents(pd.read_csv(io.BytesIO(content), **_ARROW_CSV), filename)
 
         # TXT, MD, PY
         elif file_ext in [".txt", ".md", ".py"]:
             try:
-                loader = TextLoader(tmp_path, encoding="utf-8")
-                raw_docs = loader.load()
-            except Exception:
+                text = content.decode("utf-8")
+            except UnicodeDecodeError:
                 # Fallback to latin-1 if utf-8 fails (common for some Windows files)
-                loader = TextLoader(tmp_path, encoding="ISO-8859-1")
-                raw_docs = loader.load()
+                text = content.decode("ISO-8859-1")
+            raw_docs = [Document(page_content=text, metadata={"source": filename})]
         
         # Word
         elif file_ext == ".docx":
@@ -112,32 +506,20 @@ def process_uploaded_file(filename, content):
 
         
         # Final Splitting & Vectorizing
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500, 
-            chunk_overlap=150,
-            add_start_index=True
-        )
-        chunks = text_splitter.split_documents(raw_docs)
+        chunks = _split_documents(raw_docs) + table_docs
+        # child preview for the CRAG grader (small-to-big grading)
+        for chunk in chunks:
+            chunk.metadata["child_preview"] = chunk.page_content[:CHILD_PREVIEW_CHARS]
         
-        # 1. Semantic Retriever (FAISS)
-        vector_store = FAISS.from_documents(chunks, embedding_model)
-        faiss_retriever = vector_store.as_retriever(search_kwargs={"k": 5})
-
-        # 2. Keyword Retriever (BM25)
-        bm25_retriever = BM25Retriever.from_documents(chunks)
-        bm25_retriever.k = 5
-
-        # 3. Hybrid Ensemble (RRF)
-        # Weights: 70% Semantic, 30% Keyword - good balance for documents
-        hybrid_retriever = EnsembleRetriever(
-            retrievers=[faiss_retriever, bm25_retriever], 
-            weights=[0.7, 0.3]
-        )
+        # embed once; BM25 + ensemble are assembled in _hybrid_retriever
+        texts = [chunk.page_content for chunk in chunks]
+        vector_store = _build_vector_store(chunks, _embed_texts(texts), use_gpu)
+        _save_cached_retriever(cache_key, vector_store, chunks)
 
-        return hybrid_retriever, len(chunks)
+        return _hybrid_retriever(vector_store, chunks), len(chunks)
 
     finally:
-        if os.path.exists(tmp_path):
+        if tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
 
 
@@ -148,13 +530,14 @@ def query_local_model(query, retriever):
     Returns:
         answer (str)      — the generated text
         sources (list)    — docs used for generation (relevant ones, or all retrieved as fallback)
-        grade_log (list)  — [{chunk_preview, is_relevant, reason}, ...] for the UI trace
+        grade_log (list)  — [{chunk_preview, is_relevant, graded, reason}, ...] for the UI trace
     """
     initial_state = {
         "query": query,
         "original_query": query,
         "retriever": retriever,
         "documents": [],
+        "child_docs": [],
         "relevant_docs": [],
         "generation": "",
         "retries": 0,
@@ -170,12 +553,7 @@ def query_local_model(query, retriever):
     return answer, sources, grade_log
 
 
-def extract_search_keyword(user_query):
-    """
-    Uses Llama 3 to turn a complex sentence into a simple filename keyword.
-    Example: "Show me the notes about Solar" -> "Solar"
-    """
-    system_prompt = """
+_KEYWORD_SYSTEM_PROMPT = """
     You are a Search Query Extractor.
     Extract the single most likely FILENAME keyword or TOPIC from the user's request.
     
@@ -187,14 +565,71 @@ def extract_search_keyword(user_query):
     
     User Query:
     """
-    
-    try:
-        response = ollama.chat(model='llama3.2', messages=[
-            {'role': 'system', 'content': system_prompt},
-            {'role': 'user', 'content': user_query},
-        ])
-        # extra whitespace or punctuation the model added, has to be removed
-        keyword = response['message']['content'].strip().replace('"', '').replace("'", "")
+
+# YAKE scores are "lower is better"; a confident single keyword skips the LLM entirely
+YAKE_MAX_SCORE = 0.5
+_YAKE_EXTRACTOR = yake.KeywordExtractor(lan="en", n=1, top=5) if yake is not None else None
+# request verbs / filler YAKE keeps as candidates ("Show me the budget" -> 'Show', 'budget')
+_COMMAND_WORDS = {
+    "show", "read", "open", "find", "get", "fetch", "search", "look", "list", "display",
+    "give", "tell", "summarize", "summarise", "explain", "describe", "load", "please",
+    "file", "files", "document", "documents", "doc", "named", "called", "titled",
+}
+
+def _fast_keyword(user_query):
+    """
+    Returns the keyword when the query has exactly one content word left after YAKE's
+    stopwords and _COMMAND_WORDS are dropped ("Show me the budget" -> "budget",
+    "Read the file named data.csv" -> "data"); None means ask the LLM.
+    """
+    if _YAKE_EXTRACTOR is None:
+        return None
+    candidates = [
+        (kw, score) for kw, score in _YAKE_EXTRACTOR.extract_keywords(user_query)
+        if kw.lower() not in _COMMAND_WORDS
+    ]
+    if len(candidates) != 1 or candidates[0][1] >= YAKE_MAX_SCORE:
+        return None
+    # filename mentions search by stem, same as the LLM prompt's data.csv -> data
+    return os.path.splitext(candidates[0][0])[0]
+
+@lru_cache(maxsize=512)
+def _extract_keyword_cached(normalized_query):
+    """
+    The LLM round-trip, memoized per normalized query.
+    Raises on failure so errors are never cached.
+    """
+    response = ollama.chat(model='llama3.2', messages=[
+        {'role': 'system', 'content': _KEYWORD_SYSTEM_PROMPT},
+        {'role': 'user', 'content': normalized_query},
+    ], keep_alive=OLLAMA_KEEP_ALIVE)
+    # extra whitespace or punctuation the model added, has to be removed
+    return response['message']['content'].strip().replace('"', '').replace("'", "")
+
+def extract_search_keyword(user_query):
+    """
+    Uses Llama 3 to turn a complex sentence into a simple filename keyword.
+    Example: "Show me the notes about Solar" -> "Solar"
+    Simple queries are answered by YAKE without an LLM call; the rest (and repeated
+    queries, case/whitespace-insensitive) go through the LRU-cached model call.
+    """
+    keyword = _fast_keyword(user_query)
+    if keyword:
         return keyword
+    try:
+        return _extract_keyword_cached(user_query.strip().lower())
     except Exception as e:
-        return user_query # fallback
\ No newline at end of file
+        return user_query # fallback
+
+def warm_up_models():
+    """
+    Loads nomic-embed-text and llama3.2 once and pins them for OLLAMA_KEEP_ALIVE,
+    so the first upload/query doesn't pay a multi-second cold model load.
+    Blocking - app.py / main_api.py run it in a background thread at startup,
+    so importing this module stays free of side effects.
+    """
+    try:
+        ollama.embed(model=embedding_model.model, input="warmup", keep_alive=OLLAMA_KEEP_ALIVE)
+        ollama.chat(model='llama3.2', messages=[{'role': 'user', 'content': 'hi'}], keep_alive=OLLAMA_KEEP_ALIVE)
+    except Exception:
+        pass  # Ollama not up yet - the first real call will load the models